@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import io
 import re
 from tabulate import tabulate
 import sys
@@ -11,6 +12,18 @@ def compress(input_str: str, explain: bool = False):
     1) The compression tokens as a single string (e.g. '(0,S)(0,H)...(x,<EOF>)').
     2) A table (list of rows) describing each step, if needed for explanation.
     """
+    out = io.StringIO()
+    table_rows = compress_stream(input_str, out, explain=explain)
+    return out.getvalue(), table_rows
+
+
+def compress_stream(input_str: str, out, explain: bool = False):
+    """
+    Compress `input_str` using LZ78, writing each token to the text stream
+    `out` as soon as it is emitted instead of collecting them all first.
+    Returns a table (list of rows) describing each step, if needed for
+    explanation.
+    """
     if explain:
         msg = (
             "LZ78 starts with a dictionary initialized with a single entry: "
@@ -28,66 +41,81 @@ def compress(input_str: str, explain: bool = False):
     # (so that tokens can store them unambiguously).
     processed = input_str.replace(' ', '_')
 
-    # Dictionary mapping substring -> index
-    dictionary = {'': 0}
-    current_string = ''
+    # The dictionary is kept as a trie: each entry is identified by its
+    # index, and `children` maps (parent index, symbol) -> child index.
+    # The empty string is the root, with index 0.
+    # Both parts are packed into a single int key, (parent << 21) | ord(symbol),
+    # as ord() of any character fits in 21 bits.
+    children = {}
+    node = 0
+    # Index for the next dictionary entry
+    next_id = 1
 
-    # We'll gather rows: [Step, Symbol, Prev, Concat, Concat in dict?, Prev index, Addition, Output]
-    table_rows = []
+    # Strings represented by each index, only tracked to fill in the table
+    phrases = ['']
 
-    # We also keep track of the final list of tokens to output
-    tokens = []
+    # We'll gather rows: [Step, Symbol, Prev, Concat, Concat in dict?, Prev index, Addition, Output]
+    # There is one row per symbol plus the <EOF> one, filled in by index
+    table_rows = [None] * (len(processed) + 1) if explain else []
 
     step = 1
     for symbol in processed:
-        concatenated = current_string + symbol
-        prev = current_string
-        prev_index = dictionary[prev]
-        in_dict = concatenated in dictionary
+        prev_index = node
+        key = (node << 21) | ord(symbol)
+        child = children.get(key)
+        in_dict = child is not None
 
         if in_dict:
-            # No output token here, continue building 'current_string'
+            # No output token here, continue walking down the trie
             output = '--'
-            addition = '--'
-            current_string = concatenated
+            node = child
         else:
             # We must create a new dictionary entry
-            output = f'({prev_index},{symbol})'
-            tokens.append(output)
-            dictionary[concatenated] = len(dictionary)
-            addition = f'{concatenated} => {dictionary[concatenated]}'
-            current_string = ''
-
-        table_rows.append([
-            step,
-            symbol,
-            prev,
-            concatenated,
-            in_dict,
-            prev_index,
-            addition,
-            output
-        ])
+            output = f'({node},{symbol})'
+            out.write(output)
+            new_index = next_id
+            children[key] = new_index
+            next_id += 1
+            node = 0
+
+        if explain:
+            prev = phrases[prev_index]
+            concatenated = prev + symbol
+            if in_dict:
+                addition = '--'
+            else:
+                phrases.append(concatenated)
+                addition = f'{concatenated} => {new_index}'
+
+            table_rows[step - 1] = (
+                step,
+                symbol,
+                prev,
+                concatenated,
+                in_dict,
+                prev_index,
+                addition,
+                output
+            )
         step += 1
 
-    final_token = f'({dictionary[current_string]},<EOF>)'
-    tokens.append(final_token)
+    final_token = f'({node},<EOF>)'
+    out.write(final_token)
 
-    # Add a final row to represent the "end"
-    table_rows.append([
-        step,
-        '<EOF>',
-        current_string,
-        '--',
-        '--',
-        dictionary[current_string],
-        '--',
-        final_token
-    ])
+    if explain:
+        # Add a final row to represent the "end"
+        table_rows[step - 1] = (
+            step,
+            '<EOF>',
+            phrases[node],
+            '--',
+            '--',
+            node,
+            '--',
+            final_token
+        )
 
-    # Join tokens into a single string for easy decompression input
-    compressed_str = ''.join(tokens)
-    return compressed_str, table_rows
+    return table_rows
 
 
 def decompress(compressed_str: str, explain: bool = False):
@@ -115,56 +143,61 @@ def decompress(compressed_str: str, explain: bool = False):
 
     # We will track each token and the partial output
     table_rows = []
-    # Dictionary mapping index -> string
-    dictionary = {0: ""}
-    output_pieces = []
-    current_index = 0
+    # The output is built as UTF-8 bytes. Every dictionary entry is written to
+    # it exactly once, so entries are kept as (offset, length) slices of the
+    # output instead of as separate strings. Index 0 is the empty string.
+    output = bytearray()
+    entries = [(0, 0)]
 
-    # Parse tokens using a regex
+    # Parse tokens using a regex, one at a time as we go
     #   each token is of the form (someInt, something)
     #   note that "something" could be <EOF>, a letter, or underscore, etc.
     #   We'll allow any non-`)` sequence (lazy approach).
     pattern = r"\((\d+),([^)]*)\)"
-    tokens = re.findall(pattern, compressed_str)
 
     step = 1
-    for i, (idx_str, symbol) in enumerate(tokens):
+    for match in re.finditer(pattern, compressed_str):
+        idx_str, symbol = match.groups()
         idx = int(idx_str)
         if symbol == "<EOF>":
             # If we encounter EOF, we stop reading further tokens
+            start, length = entries[idx] if idx < len(entries) else (0, 0)
+            final_string = output[start:start + length]
+            if explain:
+                table_rows.append([
+                    step,
+                    f"({idx},{symbol})",
+                    final_string.decode(),
+                    "--",
+                    "EOF reached",
+                    final_string.decode()
+                ])
+
+            output += final_string
+            break
+
+        # The new string is dictionary[idx] + the symbol
+        start, length = entries[idx]
+        new_start = len(output)
+        output += output[start:start + length]
+        output += symbol.encode()
+        entries.append((new_start, len(output) - new_start))
+
+        if explain:
+            prefix = output[start:start + length].decode()
+            new_string = prefix + symbol
             table_rows.append([
                 step,
                 f"({idx},{symbol})",
-                dictionary.get(idx, ""),
-                "--",
-                "EOF reached",
-                f"{dictionary.get(idx, '')}"
+                prefix,
+                symbol,
+                f"Index {len(entries) - 1} => '{new_string}'",
+                new_string
             ])
-
-            output_pieces.append(dictionary.get(idx, ""))
-            break
-
-        # The new string is dictionary[idx] + the symbol
-        prefix = dictionary[idx]
-        new_string = prefix + symbol
-        current_index += 1
-        dictionary[current_index] = new_string
-
-        # For final output, we accumulate
-        output_pieces.append(new_string)
-
-        table_rows.append([
-            step,
-            f"({idx},{symbol})",
-            prefix,
-            symbol,
-            f"Index {current_index} => '{new_string}'",
-            new_string
-        ])
         step += 1
 
-    # Join them, then replace underscores back with spaces
-    decompressed_str = ''.join(output_pieces).replace('_', ' ')
+    # Replace underscores back with spaces
+    decompressed_str = output.translate(bytes.maketrans(b'_', b' ')).decode()
     return decompressed_str, table_rows
 
 
@@ -200,14 +233,19 @@ def main():
         data = args.input_string
 
     if args.compress:
-        compressed_str, table_rows = compress(data, explain=args.explain)
         if args.explain:
+            compressed_str, table_rows = compress(data, explain=True)
             headers = ["Step", "Symbol", "Prev", "Concatenation", "Concat in dict?", "Prev index",
                        "Addition", "Output"]
             table = tabulate(table_rows, headers=headers, tablefmt="grid")
             print(table)
             print("\nCompressed output:")
-        print(compressed_str)
+            print(compressed_str)
+        else:
+            # Nothing is printed before the tokens, so write them out as they
+            # are produced
+            compress_stream(data, sys.stdout)
+            print()
 
     elif args.decompress:
         decompressed_str, table_rows = decompress(data, explain=args.explain)
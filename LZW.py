@@ -2,6 +2,7 @@
 import argparse
 import sys
 import re
+from array import array
 from tabulate import tabulate
 
 def lzw_compress(input_str: str, explain: bool=False):
@@ -11,6 +12,8 @@ def lzw_compress(input_str: str, explain: bool=False):
     Returns:
       codes (list of int): The compressed numeric codes.
       table_rows (list of lists): Step-by-step info for explanation (if needed).
+
+    Raises ValueError if `input_str` has symbols outside of the alphabet.
     """
     if explain:
         msg = (
@@ -22,76 +25,112 @@ def lzw_compress(input_str: str, explain: bool=False):
             )
         print(msg)
 
-    # Replace paces with underscores for internal representation.
-    processed = input_str.replace(' ', '_')
-
-    # Initialize dictionary with single-character strings
+    # The alphabet is fixed to 27 symbols:
     # 'A'..'Z' => 1..26
     # '_' => 27
-    dictionary = {}
-    for c in range(ord('A'), ord('Z')+1):
-        dictionary[chr(c)] = len(dictionary)+1
-    dictionary['_'] = len(dictionary)+1
+    alphabet = [chr(c) for c in range(ord('A'), ord('Z')+1)] + ['_']
+    alphabet_size = len(alphabet)
+
+    # Map each input byte straight to the position of its symbol in the
+    # alphabet, replacing spaces with underscores for internal representation.
+    # Bytes outside of the alphabet are mapped to 255.
+    columns = bytearray([255] * 256)
+    for column, symbol in enumerate(alphabet):
+        columns[ord(symbol)] = column
+    columns[ord(' ')] = columns[ord('_')]
+    processed = input_str.encode().translate(columns)
+    if 255 in processed:
+        bad_symbol = next(c for c in input_str if c != ' ' and c not in alphabet)
+        raise ValueError(f"Symbol {bad_symbol!r} is not in the LZW alphabet (A-Z, '_' and ' ')")
+
+    # The dictionary is kept as a trie, in a flat table with one row of
+    # `alphabet_size` entries per code: children[code * alphabet_size + column]
+    # is the code for that string followed by that symbol, or 0 if it is not
+    # in the dictionary yet. The empty string is the root (code 0), and its
+    # children are the single-character strings.
+    children = array('i', range(1, alphabet_size+1))
+    empty_row = array('i', [0] * alphabet_size)
+    for _ in alphabet:
+        children += empty_row
+    next_code = alphabet_size+1
+
+    # Strings represented by each code, only tracked to fill in the table
+    phrases = [''] + alphabet
 
     # We will build LZW codes in `output_codes`.
     # We also collect table rows
     output_codes = []
     table_rows = []
 
-    # Current recognized sequence
-    word = ""
+    # Code of the current recognized sequence
+    node = 0
     step = 0
 
     # For the table, let's store:
     # [Step, Symbol, Word (old), Concat,
     #  Concat in dict, Word(new), Output, Addition]
     # We'll add an initial row to mirror your example
+    # There is one row per symbol plus the initial and <EOF> ones, filled in
+    # by index
     if explain:
-        table_rows.append([0, '--', '--', '--', '--', '""', '--', '--'])
-
-    for step, symbol in enumerate(processed, 1):
-        old_word = word
-        concatenated = old_word + symbol
-        in_dict = concatenated in dictionary
+        table_rows = [None] * (len(processed) + 2)
+        table_rows[0] = (0, '--', '--', '--', '--', '""', '--', '--')
+
+    for step, column in enumerate(processed, 1):
+        old_node = node
+        slot = node * alphabet_size + column
+        child = children[slot]
+        in_dict = child != 0
         if in_dict:
             # If the concatenated string is in the dictionary, keep building.
             output = "--"
-            addition = "--"
-            word = concatenated
+            node = child
         else:
             # Output the code for 'old_word'
-            output = dictionary[old_word]
-            dictionary[concatenated] = len(dictionary)+1
-            addition = f"{concatenated} => {dictionary[concatenated]}"
-            # Start `word` again from the current symbol
-            word = symbol
+            output = node
+            children[slot] = next_code
+            children += empty_row
+            next_code += 1
+            # Start the word again from the current symbol
+            node = column + 1
             # Store the code
             output_codes.append(output)
 
-        table_rows.append([
-            step,
-            symbol,
-            old_word,
-            concatenated,
-            in_dict,
-            word,
-            output,
-            addition
-        ])
+        if explain:
+            symbol = alphabet[column]
+            old_word = phrases[old_node]
+            concatenated = old_word + symbol
+            if in_dict:
+                addition = "--"
+            else:
+                phrases.append(concatenated)
+                addition = f"{concatenated} => {next_code - 1}"
+
+            table_rows[step] = (
+                step,
+                symbol,
+                old_word,
+                concatenated,
+                in_dict,
+                phrases[node],
+                output,
+                addition
+            )
 
     # Output the last string
-    final_code = dictionary[word]
+    final_code = node
     output_codes.append(final_code)
-    table_rows.append([
-        step+1,
-        "<EOF>",
-        word,
-        "--",
-        "--",
-        "--",
-        final_code,
-        "--"
-    ])
+    if explain:
+        table_rows[step+1] = (
+            step+1,
+            "<EOF>",
+            phrases[node],
+            "--",
+            "--",
+            "--",
+            final_code,
+            "--"
+        )
 
     return output_codes, table_rows
 
@@ -130,15 +169,17 @@ def lzw_decompress(code_str: str, explain: bool=False):
     # Convert to int
     codes = list(map(int, code_values))
 
-    # Build the initial dictionary (inverse of compress)
+    # Every new dictionary entry is a decoded string plus the symbol written
+    # right after it in the output, so entries are stored as (offset, length)
+    # slices of the output bytes instead of as separate strings.
+    # The output starts with the initial dictionary (inverse of compress) so
+    # that those entries are slices too:
     # Index 1..26 -> 'A'..'Z', 27 -> '_'
-    dictionary = {}
-    for c in range(ord('A'), ord('Z') + 1):
-        dictionary[len(dictionary) + 1] = chr(c)
-    dictionary[len(dictionary) + 1] = '_'
-
-    # We'll build the output characters in `decompressed_pieces`.
-    decompressed_pieces = []
+    output = bytearray(range(ord('A'), ord('Z') + 1))
+    output += b'_'
+    alphabet_size = len(output)
+    offsets = [None] + list(range(alphabet_size))
+    lengths = [None] + [1] * alphabet_size
 
     # For explanation, we store rows as:
     # [Step, Code, Dictionary Entry, Dictionary Addition, Output so far]
@@ -150,47 +191,59 @@ def lzw_decompress(code_str: str, explain: bool=False):
     # LZW decompression algorithm
     # 1) The first code is just looked up in the dictionary.
     old_code = codes[0]
-    old_string = dictionary[old_code]
-    decompressed_pieces.append(old_string)
+    old_start = len(output)
+    old_length = lengths[old_code]
+    output += output[offsets[old_code]:offsets[old_code] + old_length]
 
-    table_rows.append([
-        1,
-        old_code,
-        old_string,
-        "--",
-        old_string
-    ])
+    if explain:
+        old_string = output[old_start:].decode()
+        table_rows.append([
+            1,
+            old_code,
+            old_string,
+            "--",
+            old_string
+        ])
 
     for step, c in enumerate(codes[1:], 2):
-        if c in dictionary:
-            explanation = current_string = dictionary[c]
+        start = len(output)
+        in_dict = 0 < c < len(offsets)
+        if in_dict:
+            offset = offsets[c]
+            output += output[offset:offset + lengths[c]]
         else:
             # If code 'c' is not yet in the dictionary, it must be
             # old_string + the first character of old_string.
-            current_string = old_string + old_string[0]
-            explanation = f"{old_string} + {old_string[0]}"
-
-        decompressed_pieces.append(current_string)
-
-        # Build new entry in the dictionary:
-        # dictionary[next_code_idx] = old_string + first char of current_string
-        new_entry = old_string + current_string[0]
-        dictionary[len(dictionary) + 1] = new_entry
-        added_info = f"{len(dictionary)} => '{new_entry}'"
-
-        so_far = ''.join(decompressed_pieces)
-        table_rows.append([
-            step,
-            c,
-            explanation,
-            added_info,
-            so_far
-        ])
-
-        old_string = current_string
-
-    # Join all pieces, then replace underscores with spaces
-    decompressed = ''.join(decompressed_pieces).replace('_', ' ')
+            output += output[old_start:start]
+            output.append(output[old_start])
+
+        # Build new entry in the dictionary: old_string + first char of
+        # current_string, which is what follows old_string in the output
+        offsets.append(old_start)
+        lengths.append(old_length + 1)
+
+        if explain:
+            if in_dict:
+                explanation = output[start:].decode()
+            else:
+                old_string = output[old_start:start].decode()
+                explanation = f"{old_string} + {old_string[0]}"
+            new_entry = output[old_start:old_start + old_length + 1].decode()
+            added_info = f"{len(offsets) - 1} => '{new_entry}'"
+
+            so_far = output[alphabet_size:].decode()
+            table_rows.append([
+                step,
+                c,
+                explanation,
+                added_info,
+                so_far
+            ])
+
+        old_start, old_length = start, len(output) - start
+
+    # Replace underscores with spaces
+    decompressed = output[alphabet_size:].translate(bytes.maketrans(b'_', b' ')).decode()
     return decompressed, table_rows
 
 
@@ -223,7 +276,11 @@ def main():
         data = args.input_string
 
     if args.compress:
-        codes, table_rows = lzw_compress(data, explain=args.explain)
+        try:
+            codes, table_rows = lzw_compress(data, explain=args.explain)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
         if args.explain:
             headers = ["Step", "Symbol", "Word (old)", "Concat",
                        "Concat in dict", "Word(new)", "Output", "Addition"]
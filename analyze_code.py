@@ -17,22 +17,16 @@ def is_prefix_code(codewords):
     """
     Returns True if no codeword is a prefix of another. Otherwise False.
     """
-    # A quick way is to sort by length (or lexicographically) and check prefixes.
+    # Once sorted lexicographically, every word between w and a word that w is
+    # a prefix of also starts with w, so only adjacent pairs need checking.
     sorted_codewords = sorted(codewords)
-    n = len(sorted_codewords)
-
-    # We'll do a nested check: for each pair, see if one is prefix of the other
-    for i in range(n):
-        for j in range(i+1, n):
-            w1 = sorted_codewords[i]
-            w2 = sorted_codewords[j]
-            # If w1 is prefix of w2 or w2 is prefix of w1
-            if w2.startswith(w1):
-                print(f"Found prefix: '{w1}' is a prefix of '{w2}'")
-                return False
-            # Because of sorting, w1 <= w2 lexicographically,
-            # no need to check w1.startswith(w2) except they might be equal,
-            # but presumably no duplicates. If duplicates exist, that also kills prefix property.
+
+    for w1, w2 in zip(sorted_codewords, sorted_codewords[1:]):
+        # w1 <= w2 lexicographically, so only w1 can be a prefix of w2.
+        # Duplicates also count, as they also kill the prefix property.
+        if w2.startswith(w1):
+            print(f"Found prefix: '{w1}' is a prefix of '{w2}'")
+            return False
     print("No codeword is prefix of another.")
     return True
 
@@ -40,6 +34,8 @@ def kraft_sum(codewords):
     """
     Computes the Kraft sum exactly:
     sum( r^(-len(w)) for w in codewords ), using rational arithmetic.
+    All terms are brought to the common denominator r^max_len, so only
+    integers are added and a single Fraction is built at the end.
     """
     r = set(c for word in codewords for c in word)
     radix = len(r)
@@ -47,10 +43,12 @@ def kraft_sum(codewords):
     if radix == 0:
         return Fraction(0, 1)
 
-    return sum(
-        Fraction(1, radix ** len(w))
+    max_len = max(len(w) for w in codewords)
+    numerator = sum(
+        radix ** (max_len - len(w))
         for w in codewords
     )
+    return Fraction(numerator, radix ** max_len)
 
 def is_huffman_code(codewords):
     """
@@ -72,28 +70,63 @@ def sardinas_patterson(codewords):
     # Convert codewords to a set for convenience
     C = set(codewords)
 
-    def left_residual(X, Y):
+    # Trie over C as nested dicts {symbol: child}; the node where a codeword
+    # ends stores the codeword itself under the key None.
+    trie = {}
+    for word in C:
+        node = trie
+        for symbol in word:
+            node = node.setdefault(symbol, {})
+        node[None] = word
+
+    def residuals_of(X):
         """
-        L^R(X, Y) = { suffix of y after removing prefix x
-                      if y.startswith(x) }
+        L^R(X, C) = { suffix of y after removing prefix x
+                      if y.startswith(x) }, for x in X and y in C.
+        Each x is followed down the trie, and every codeword below it is a y.
         """
         result = set()
         for x in X:
-            for y in Y:
-                if len(y) >= len(x) and y.startswith(x):
-                    suffix = y[len(x):]
-                    # If suffix != "", we include it. The standard algorithm
-                    # might keep the empty suffix if x != y; let's keep the standard approach:
-                    result.add(suffix)
+            node = trie
+            for symbol in x:
+                node = node.get(symbol)
+                if node is None:
+                    break
+            else:
+                stack = [node]
+                while stack:
+                    node = stack.pop()
+                    for symbol, child in node.items():
+                        if symbol is None:
+                            result.add(child[len(x):])
+                        else:
+                            stack.append(child)
+        return result
+
+    def residuals_in(Y):
+        """
+        L^R(C, Y) = { suffix of y after removing prefix x
+                      if y.startswith(x) }, for x in C and y in Y.
+        Each y is followed down the trie, and every codeword ending on the
+        way is an x.
+        """
+        result = set()
+        for y in Y:
+            node = trie
+            for i, symbol in enumerate(y):
+                if None in node:
+                    result.add(y[i:])
+                node = node.get(symbol)
+                if node is None:
+                    break
+            else:
+                if None in node:
+                    result.add("")
         return result
 
-    # 1) E1 = L^R(C, C), excluding identical pairs if needed
-    E = set()
-    for x in C:
-        for y in C:
-            if x != y and y.startswith(x):
-                suffix = y[len(x):]
-                E.add(suffix)
+    # 1) E1 = L^R(C, C), excluding identical pairs (the only ones leaving an
+    #    empty suffix)
+    E = residuals_in(C) - {""}
 
     k = 1
     print(f"E1 = {E if E else '{}'}")
@@ -106,7 +139,7 @@ def sardinas_patterson(codewords):
     # 2) Iterate
     while True:
         # E_{k+1} = L^R(E_k, C) ∪ L^R(C, E_k)
-        E_next = left_residual(E, C) | left_residual(C, E)
+        E_next = residuals_of(E) | residuals_in(E)
         k += 1
         print(f"E{k} = {E_next if E_next else '{}'}")
 
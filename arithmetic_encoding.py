@@ -2,6 +2,7 @@
 import argparse
 import sys
 import math
+from bisect import bisect_right
 from tabulate import tabulate
 
 
@@ -31,7 +32,9 @@ def parse_frequencies(freq_str):
         # Each part is "Symbol:Freq"
         try:
             symbol, freq_s = part.split(':')
-            symbol = symbol.strip()
+            # Intern the symbol, so that it is the same object as any other
+            # equal string and later lookups can match it by identity
+            symbol = sys.intern(symbol.strip())
             freq = float(freq_s.strip())
             probabilities[symbol] = freq
         except ValueError:
@@ -48,57 +51,66 @@ def parse_frequencies(freq_str):
 
 def build_cdf(probabilities):
     """
-    Build a dictionary of cumulative distribution:
-    cdf[sym] = sum of all p(x) for x < sym (sorted by symbol).
-    cdf_next[sym] = cdf[sym] + probabilities[sym].
-    Returns (cdf, cdf_next, sorted_symbols).
+    Build the cumulative distribution as lists indexed by symbol id, with
+    symbols numbered in sorted order:
+    cdf_lo[i] = sum of all p(x) for x < sorted_syms[i].
+    cdf_hi[i] = cdf_lo[i] + probabilities[sorted_syms[i]].
+    Returns (sym_to_id, cdf_lo, cdf_hi, sorted_symbols).
     """
     sorted_syms = sorted(probabilities.keys())
-    cdf = {}
+    sym_to_id = {s: i for i, s in enumerate(sorted_syms)}
+    cdf_lo = []
     running_sum = 0.0
     for s in sorted_syms:
-        cdf[s] = running_sum
+        cdf_lo.append(running_sum)
         running_sum += probabilities[s]
-    cdf_next = {s: cdf[s] + probabilities[s] for s in sorted_syms}
-    return cdf, cdf_next, sorted_syms
+    cdf_hi = [low + probabilities[s] for low, s in zip(cdf_lo, sorted_syms)]
+    return sym_to_id, cdf_lo, cdf_hi, sorted_syms
 
 
 def arithmetic_encode(probabilities, message, explain=False):
     """
     Perform arithmetic encoding on 'message' using the specified dictionary
     'probabilities' {symbol: p}. Returns:
-      - table_rows (for explanation)
+      - table_rows (for explanation, empty unless 'explain' is set)
       - final interval (L, H)
     """
-    cdf, cdf_next, sorted_syms = build_cdf(probabilities)
+    sym_to_id, cdf_lo, cdf_hi, sorted_syms = build_cdf(probabilities)
+    # Convert the message to symbol ids once
+    ids = [sym_to_id[sym] for sym in message]
 
     L = 0.0
     H = 1.0
-    table_rows = [[0, '--', '--', '--', '0.0', '1.0']]
+    table_rows = []
+    if explain:
+        # One row per symbol plus the initial one, filled in by index
+        table_rows = [None] * (len(ids) + 1)
+        table_rows[0] = (0, '--', '--', '--', '0.0', '1.0')
 
-    for i, sym in enumerate(message, start=1):
+    for i, sym_id in enumerate(ids, start=1):
         interval_width = H - L
 
         # Sub-interval for this symbol
-        sym_low = cdf[sym]
-        sym_high = cdf_next[sym]
+        sym_low = cdf_lo[sym_id]
+        sym_high = cdf_hi[sym_id]
 
         newL = L + interval_width * sym_low
         newH = L + interval_width * sym_high
 
-        interval_width_str = minimal_decimal_str(interval_width)
-        L_str = minimal_decimal_str(L)
-        H_str = minimal_decimal_str(H)
-        newL_str = minimal_decimal_str(newL)
-        newH_str = minimal_decimal_str(newH)
-        table_rows.append([
-            i,
-            sym,
-            f"[{minimal_decimal_str(sym_low)}, {minimal_decimal_str(sym_high)})",
-            interval_width_str,
-            f"{L_str} + {interval_width_str} * {minimal_decimal_str(sym_low)} = {newL_str}",
-            f"{L_str} + {interval_width_str} * {minimal_decimal_str(sym_high)} = {newH_str}",
-        ])
+        if explain:
+            interval_width_str = minimal_decimal_str(interval_width)
+            L_str = minimal_decimal_str(L)
+            H_str = minimal_decimal_str(H)
+            newL_str = minimal_decimal_str(newL)
+            newH_str = minimal_decimal_str(newH)
+            table_rows[i] = (
+                i,
+                sorted_syms[sym_id],
+                f"[{minimal_decimal_str(sym_low)}, {minimal_decimal_str(sym_high)})",
+                interval_width_str,
+                f"{L_str} + {interval_width_str} * {minimal_decimal_str(sym_low)} = {newL_str}",
+                f"{L_str} + {interval_width_str} * {minimal_decimal_str(sym_high)} = {newH_str}",
+            )
 
         L, H = newL, newH
 
@@ -109,10 +121,11 @@ def arithmetic_decode(probabilities, code, length, explain=False):
     """
     Decode a float 'code' into 'length' symbols using 'probabilities'.
     Returns:
-      - table_rows: A list of rows (lists/tuples) for explanation
+      - table_rows: A list of rows (lists/tuples) for explanation, empty
+        unless 'explain' is set
       - decoded_message: the resulting string
     """
-    cdf, cdf_next, sorted_syms = build_cdf(probabilities)
+    _, cdf_lo, cdf_hi, sorted_syms = build_cdf(probabilities)
 
     L = 0.0
     H = 1.0
@@ -131,32 +144,206 @@ def arithmetic_decode(probabilities, code, length, explain=False):
         # Compute interval width
         interval_width = oldH - oldL
 
-        # Find which symbol's subinterval contains x
+        # Find which symbol's subinterval contains x.
+        # Subintervals are contiguous and sorted, so binary search for the
+        # first one ending after x: it is the only one that can contain it.
+        lo, hi = 0, len(sorted_syms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if x < oldL + interval_width * cdf_hi[mid]:
+                hi = mid
+            else:
+                lo = mid + 1
+
         found_symbol = None
-        for sym in sorted_syms:
-            sym_low = oldL + interval_width * cdf[sym]
-            sym_high = oldL + interval_width * cdf_next[sym]
-            if sym_low <= x < sym_high:
-                found_symbol = sym
+        if lo < len(sorted_syms):
+            sym_low = oldL + interval_width * cdf_lo[lo]
+            if sym_low <= x:
+                found_symbol = sorted_syms[lo]
                 # Update the interval for the next iteration
-                L, H = sym_low, sym_high
-                break
+                L, H = sym_low, oldL + interval_width * cdf_hi[lo]
 
         message.append(found_symbol)
 
-        oldL_str = minimal_decimal_str(oldL)
-        oldH_str = minimal_decimal_str(oldH)
-        interval_width_str = minimal_decimal_str(interval_width)
-        newL_str = minimal_decimal_str(L)
-        newH_str = minimal_decimal_str(H)
-        table_rows.append([
-            i,
-            f"{code_str}",
-            f"[{oldL_str}, {oldH_str})",
-            f"{interval_width_str}",
-            f"{found_symbol!r}",
-            f"[{newL_str}, {newH_str})"
-        ])
+        if explain:
+            oldL_str = minimal_decimal_str(oldL)
+            oldH_str = minimal_decimal_str(oldH)
+            interval_width_str = minimal_decimal_str(interval_width)
+            newL_str = minimal_decimal_str(L)
+            newH_str = minimal_decimal_str(H)
+            table_rows.append([
+                i,
+                f"{code_str}",
+                f"[{oldL_str}, {oldH_str})",
+                f"{interval_width_str}",
+                f"{found_symbol!r}",
+                f"[{newL_str}, {newH_str})"
+            ])
+
+    return table_rows, ''.join(message)
+
+
+def build_integer_cdf(probabilities, scale=1 << 16):
+    """
+    Turn 'probabilities' into integer frequencies for the integer coder.
+    Each symbol gets round(p * scale), but at least 1 so it can still be coded.
+    Returns (sym_to_id, cum_low, cum_high, total, sorted_syms), where the
+    symbol with id i (in sorted order) takes the range
+    [cum_low[i], cum_high[i]) out of 'total'.
+    """
+    sorted_syms = sorted(probabilities.keys())
+    sym_to_id = {s: i for i, s in enumerate(sorted_syms)}
+    cum_low = []
+    cum_high = []
+    total = 0
+    for s in sorted_syms:
+        cum_low.append(total)
+        total += max(1, round(probabilities[s] * scale))
+        cum_high.append(total)
+    return sym_to_id, cum_low, cum_high, total, sorted_syms
+
+
+def integer_arithmetic_encode(probabilities, message, precision=32, explain=False):
+    """
+    Encode 'message' keeping the interval [low, high] as 'precision'-bit
+    integers instead of floats. Whenever the leading bits of low and high
+    agree they are shifted out as code bits (renormalization), so the
+    interval never runs out of precision, however long the message is.
+    Returns:
+      - table_rows (for explanation, empty unless 'explain' is set)
+      - bits: the code, as a string of '0' and '1'
+    """
+    sym_to_id, cum_low, cum_high, total, sorted_syms = build_integer_cdf(probabilities)
+    # Convert the message to symbol ids once
+    ids = [sym_to_id[sym] for sym in message]
+
+    half = 1 << (precision - 1)
+    quarter = 1 << (precision - 2)
+    # Otherwise narrow intervals could leave some symbols an empty range
+    if total > quarter:
+        raise ValueError(f"A precision of {precision} bits is too small for a total "
+                         f"frequency of {total}")
+
+    low = 0
+    high = (1 << precision) - 1
+    # Bits still to be output, whose value depends on which half the interval
+    # ends up in (it straddled the middle when they were shifted out)
+    pending = 0
+    bits = []
+    table_rows = []
+
+    for i, sym_id in enumerate(ids, start=1):
+        width = high - low + 1
+        high = low + width * cum_high[sym_id] // total - 1
+        low = low + width * cum_low[sym_id] // total
+
+        step_low, step_high, step_bits = low, high, len(bits)
+        while True:
+            if high < half:
+                bits.append('0' + '1' * pending)
+                pending = 0
+            elif low >= half:
+                bits.append('1' + '0' * pending)
+                pending = 0
+                low -= half
+                high -= half
+            elif low >= quarter and high < half + quarter:
+                pending += 1
+                low -= quarter
+                high -= quarter
+            else:
+                break
+            low = 2 * low
+            high = 2 * high + 1
+
+        if explain:
+            table_rows.append([
+                i,
+                sorted_syms[sym_id],
+                f"[{cum_low[sym_id]}, {cum_high[sym_id]}) / {total}",
+                f"[{step_low}, {step_high}]",
+                ''.join(bits[step_bits:]) or '--',
+                f"[{low}, {high}]",
+                pending
+            ])
+
+    # Two more bits (plus the pending ones) single out a value inside the
+    # final interval
+    pending += 1
+    if low < quarter:
+        bits.append('0' + '1' * pending)
+    else:
+        bits.append('1' + '0' * pending)
+
+    return table_rows, ''.join(bits)
+
+
+def integer_arithmetic_decode(probabilities, bits, length, precision=32, explain=False):
+    """
+    Decode 'length' symbols from a bit string produced by
+    integer_arithmetic_encode with the same 'probabilities' and 'precision'.
+    Returns:
+      - table_rows (for explanation, empty unless 'explain' is set)
+      - decoded_message: the resulting string
+    """
+    _, cum_low, cum_high, total, sorted_syms = build_integer_cdf(probabilities)
+
+    half = 1 << (precision - 1)
+    quarter = 1 << (precision - 2)
+    # Otherwise narrow intervals could leave some symbols an empty range
+    if total > quarter:
+        raise ValueError(f"A precision of {precision} bits is too small for a total "
+                         f"frequency of {total}")
+
+    # Bits past the end of the code are read as 0
+    bit_stream = iter(bits)
+    value = 0
+    for _ in range(precision):
+        value = 2 * value + int(next(bit_stream, '0'))
+
+    low = 0
+    high = (1 << precision) - 1
+    table_rows = []
+    message = []
+
+    for i in range(1, length + 1):
+        width = high - low + 1
+        # Position of the value within the interval, in frequency counts
+        scaled = ((value - low + 1) * total - 1) // width
+        sym_id = bisect_right(cum_high, scaled)
+        sym = sorted_syms[sym_id]
+        message.append(sym)
+
+        old_low, old_high = low, high
+        high = low + width * cum_high[sym_id] // total - 1
+        low = low + width * cum_low[sym_id] // total
+
+        if explain:
+            table_rows.append([
+                i,
+                value,
+                f"[{old_low}, {old_high}]",
+                f"{scaled} / {total}",
+                f"{sym!r}",
+                f"[{low}, {high}]"
+            ])
+
+        while True:
+            if high < half:
+                pass
+            elif low >= half:
+                low -= half
+                high -= half
+                value -= half
+            elif low >= quarter and high < half + quarter:
+                low -= quarter
+                high -= quarter
+                value -= quarter
+            else:
+                break
+            low = 2 * low
+            high = 2 * high + 1
+            value = 2 * value + int(next(bit_stream, '0'))
 
     return table_rows, ''.join(message)
 
@@ -185,6 +372,27 @@ def print_decode_table(table_rows, decoded):
     print(f"\nDecoded message: {decoded}")
 
 
+def print_integer_encode_table(table_rows, bits):
+    """
+    Print an integer encoding explanation table, then the resulting code.
+    """
+    headers = ["i", "Sym", "Range", "[L_i, H_i]", "Bits out", "Renormalized [L_i, H_i]",
+               "Pending bits"]
+    table = tabulate(table_rows, headers=headers, tablefmt="grid")
+    print(table)
+    print(f"\nCode: {bits}")
+
+
+def print_integer_decode_table(table_rows, decoded):
+    """
+    Print an integer decoding explanation table, then the final decoded message.
+    """
+    headers = ["i", "Code (x)", "Old Interval", "Scaled x", "Found Symbol", "New Interval [L_i, H_i]"]
+    table = tabulate(table_rows, headers=headers, tablefmt="grid")
+    print(table)
+    print(f"\nDecoded message: {decoded}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Arithmetic encoding/decoding from the command line."
@@ -198,6 +406,8 @@ def main():
     parser.add_argument("frequencies", help="Frequencies in the form 'A:0.2,B:0.3,C:0.5,...'")
 
     parser.add_argument("--explain", action="store_true", help="Show step-by-step table")
+    parser.add_argument("--integer", action="store_true",
+                        help="Use integer arithmetic with renormalization; the code is a bit string")
     parser.add_argument("--length", type=int, default=None,
                         help="Number of symbols to decode (required if --decode)")
 
@@ -218,6 +428,15 @@ def main():
             print('ERROR: Some symbols in the string have not been given a probability')
             sys.exit(1)
 
+        if args.integer:
+            table_rows, bits = integer_arithmetic_encode(probabilities, message,
+                                                         explain=args.explain)
+            if args.explain:
+                print_integer_encode_table(table_rows, bits)
+            else:
+                print(bits)
+            return
+
         table_rows, (L, H) = arithmetic_encode(probabilities, message, explain=args.explain)
 
         if args.explain:
@@ -228,6 +447,26 @@ def main():
             print(minimal_decimal_str(midpoint))
 
     elif args.decode:
+        # Must have --length specified
+        if args.length is None:
+            print("Error: --length is required for decoding.", file=sys.stderr)
+            sys.exit(1)
+
+        if args.integer:
+            # Input is a bit string
+            if not set(args.input).issubset({'0', '1'}):
+                print(f"Error: For decoding with --integer, 'input' must be a string of "
+                      f"0s and 1s. Got '{args.input}'.", file=sys.stderr)
+                sys.exit(1)
+
+            table_rows, decoded = integer_arithmetic_decode(probabilities, args.input,
+                                                            args.length, explain=args.explain)
+            if args.explain:
+                print_integer_decode_table(table_rows, decoded)
+            else:
+                print(decoded)
+            return
+
         # Input is a float code
         try:
             code_val = float(args.input)
@@ -236,11 +475,6 @@ def main():
                   file=sys.stderr)
             sys.exit(1)
 
-        # Must have --length specified
-        if args.length is None:
-            print("Error: --length is required for decoding.", file=sys.stderr)
-            sys.exit(1)
-
         table_rows, decoded = arithmetic_decode(probabilities, code_val, args.length,
                                                 explain=args.explain)
 
@@ -2,34 +2,136 @@
 
 import argparse
 import sys
-from math import log2, ceil
+from math import fsum, log2, ceil
+from operator import mul
 from collections import Counter, namedtuple
-import heapq
-from anytree import Node, RenderTree
 
-def compute_entropy(probabilities):
+def count_frequencies(text):
     """
-    Given a dict {symbol: probability}, compute the Shannon entropy:
-      H(X) = -Σ p(x) log2(p(x))
+    Count the appearances of each symbol in `text`.
+    Returns a dict {symbol: count}, in order of first appearance (as Counter).
     """
-    entropy = 0.0
-    for p in probabilities.values():
-        if p > 0:
-            entropy -= p * log2(p)
-    return entropy
+    if len(text) > 1024:
+        # Texts with few distinct symbols are counted with one str.count()
+        # scan per symbol, which runs much faster than Counter's loop over
+        # every character. The alphabet is guessed from the start of the text,
+        # which is enough as long as the counts add up to the whole text.
+        # Past about 32 symbols the repeated scans stop paying off (they break
+        # even with counting the bytes below at around 50).
+        alphabet = set(text[:4096])
+        if len(alphabet) <= 32:
+            counts = {sym: text.count(sym) for sym in sorted(alphabet, key=text.index)}
+            if sum(counts.values()) == len(text):
+                return counts
 
-import heapq
-from collections import namedtuple
-from anytree import Node, RenderTree
+        # Texts that fit in one byte per character are counted over their
+        # bytes, which is faster than counting the characters
+        try:
+            data = text.encode('latin-1')
+        except UnicodeEncodeError:
+            pass
+        else:
+            return {chr(byte): count for byte, count in Counter(data).items()}
+    return Counter(text)
 
-def build_huffman_code(freq_table, explain=False):
+
+def merge_nodes(counts):
+    """
+    Build the shape of a Huffman tree for leaves with the given `counts`.
+    The leaves are nodes 0..n-1, and each merge adds the next node after them.
+    Returns:
+      - left, right: lists with the children of each node (-1 for leaves)
+      - root: index of the root node
+    """
+    n = len(counts)
+    left = [-1] * n
+    right = [-1] * n
+
+    # Two queues are used instead of a heap: the leaves sorted by count, and
+    # the merged nodes, which are created in order of increasing count and so
+    # are always sorted as well. The smallest node is then always at the
+    # front of one of them.
+    # Both queues are plain lists read through an index, and each entry is
+    # packed into a single int, (count << shift) | node, so that entries are
+    # sorted and compared as plain ints. Ties between counts are then broken
+    # by node index, so the leaves, which were created first, go first.
+    shift = (2 * n).bit_length()
+    mask = (1 << shift) - 1
+    leaf_q = sorted([(count << shift) | idx for idx, count in enumerate(counts)])
+    merged_q = []
+    next_leaf = 0
+    next_merged = 0
+
+    for merged_node in range(n, 2 * n - 1):
+        merged_count = 0
+        for children in (left, right):
+            if next_leaf < n and (next_merged == len(merged_q) or
+                                  leaf_q[next_leaf] < merged_q[next_merged]):
+                entry = leaf_q[next_leaf]
+                next_leaf += 1
+            else:
+                entry = merged_q[next_merged]
+                next_merged += 1
+            children.append(entry & mask)
+            merged_count += entry >> shift
+        merged_q.append((merged_count << shift) | merged_node)
+
+    # The last node created is the root
+    return left, right, len(left) - 1
+
+
+def canonical_codes(symbols, lengths):
+    """
+    Assign canonical Huffman codes (as in DEFLATE) from the code length of
+    each symbol. Symbols are sorted by (length, symbol) and given consecutive
+    codes, which are shifted left whenever the length grows.
+    Returns a dict {symbol: binary_code_string}.
+    """
+    codes = {}
+    code = 0
+    prev_length = 0
+    for length, sym in sorted(zip(lengths, symbols)):
+        code <<= length - prev_length
+        codes[sym] = format(code, f"0{length}b")
+        code += 1
+        prev_length = length
+    return codes
+
+
+def code_tree(symbols, codes):
+    """
+    Build the code tree whose root-to-leaf paths are `codes` ({symbol:
+    binary_code_string}, a complete prefix code), in the same flat lists as
+    merge_nodes: leaves first, in the order of `symbols`, and every other node
+    after its children.
+    Returns (left, right, root).
+    """
+    left = [-1] * len(symbols)
+    right = [-1] * len(symbols)
+    node_of = {codes[sym]: node for node, sym in enumerate(symbols)}
+    # Nodes are created level by level from the deepest one up, so that the
+    # children of a node always exist when it is created
+    for length in range(max(map(len, node_of)) - 1, -1, -1):
+        for prefix in sorted({code[:length] for code in node_of if len(code) == length + 1}):
+            node_of[prefix] = len(left)
+            left.append(node_of[prefix + "0"])
+            right.append(node_of[prefix + "1"])
+    return left, right, node_of[""]
+
+
+def build_huffman_code(freq_table, explain=False, canonical=False):
     """
     Build a static Huffman code from a frequency table {symbol: count}.
+    If 'canonical' is set, only the code lengths are taken from the tree, and
+    the codes themselves are assigned canonically (see canonical_codes).
     Returns:
       - codes: dict {symbol: binary_code_string}
       - avg_length: the average code length (sum of p_i * length(code_i))
+      - entropy: the Shannon entropy of the distribution, -Σ p_i log2(p_i)
       - probabilities: dict {symbol: p_i}, i.e. relative frequencies
-      - huffman_tree: root node of the Huffman tree (for visualization)
+      - huffman_tree: the Huffman tree as flat lists (symbols, left, right,
+        root), see merge_nodes; to_anytree() converts it for visualization.
+        With 'canonical', it is the tree of the canonical codes instead.
     """
 
     if explain:
@@ -54,6 +156,14 @@ def build_huffman_code(freq_table, explain=False):
             "\t\tPi >= Pj --> Li <= Lj"
         )
         print(msg)
+        if canonical:
+            msg = (
+                "\n"
+                "For a canonical Huffman code, only the length of each code is taken from the tree.\n"
+                "Symbols are sorted by code length (and then by symbol), and each one gets the next\n"
+                "binary number of its length, so that the code can be rebuilt from the lengths alone."
+            )
+            print(msg)
 
     # Compute probabilities
     total_count = sum(freq_table.values())
@@ -62,48 +172,79 @@ def build_huffman_code(freq_table, explain=False):
     # Edge case: if only one symbol, assign code "0"
     if len(freq_table) == 1:
         sym = next(iter(freq_table))
-        return {sym: "0"}, 0.0, probabilities, Node(sym)
+        return {sym: "0"}, 0.0, 0.0, probabilities, ([sym], [-1], [-1], 0)
+
+    # The tree is kept in flat lists indexed by node: leaves come first, in
+    # the order of `freq_table`, and every merge appends a new node.
+    symbols = list(freq_table)
+    counts = list(freq_table.values())
+    left, right, root = merge_nodes(counts)
 
-    # Min-heap of (count, unique_id, tree_node)
-    heap = []
-    unique_id = 0
+    # Generate Huffman codes. Codes are carried down the tree as integers
+    # with their length, and only formatted as a string once for each leaf.
+    codes = {}
 
-    # Initialize heap with leaf nodes
-    for sym, count in freq_table.items():
-        node = Node(sym)  # Leaf node
-        heapq.heappush(heap, (count, unique_id, node))
-        unique_id += 1
+    # The tree is walked without recursion: every node is created after its
+    # children, so going through the nodes from the root backwards reaches
+    # each node after its parent, and its code can be derived from the
+    # parent's one. This also means that very deep trees cannot hit the
+    # recursion limit.
+    node_code = [0] * len(left)
+    node_len = [0] * len(left)
+    for node in range(root, len(symbols) - 1, -1):
+        code = node_code[node] << 1
+        length = node_len[node] + 1
+        node1, node2 = left[node], right[node]
+        node_code[node1], node_len[node1] = code, length
+        node_code[node2], node_len[node2] = code | 1, length
 
-    # Build Huffman tree
-    while len(heap) > 1:
-        count1, _, node1 = heapq.heappop(heap)
-        count2, _, node2 = heapq.heappop(heap)
+    # The leaves are the first nodes
+    for node, sym in enumerate(symbols):
+        length = node_len[node]
+        if not canonical:
+            codes[sym] = format(node_code[node], f"0{length}b")
 
-        merged_node = Node(f"{node1.name}+{node2.name}", children=[node1, node2])
-        merged_count = count1 + count2
-        heapq.heappush(heap, (merged_count, unique_id, merged_node))
-        unique_id += 1
+    # With p = c / total, each entropy term is
+    #   -p * log2(p) = c * log2(total / c) / total
+    # which is never negative, so the sum does not suffer from cancellation.
+    # Many symbols share the same count, so each term is computed once per
+    # distinct count, and fsum() adds them up without accumulating rounding
+    # errors.
+    term_of = {count: count * log2(total_count / count) for count in set(counts) if count > 0}
+    entropy = fsum(term_of[count] for count in counts if count > 0) / total_count
 
-    # Extract root of Huffman tree
-    [(_, _, root)] = heap
+    # The average code length is the dot product of the counts and the code
+    # lengths of the leaves, all integers, divided by the total count once.
+    leaf_lengths = node_len[:len(symbols)]
+    avg_length = sum(map(mul, counts, leaf_lengths)) / total_count
 
-    # Generate Huffman codes
-    codes = {}
+    if canonical:
+        codes = canonical_codes(symbols, leaf_lengths)
+        # Same shape at each depth, but the paths must match the new codes
+        left, right, root = code_tree(symbols, codes)
 
-    def traverse(node, prefix=""):
-        if not node.children:  # Leaf node
-            codes[node.name] = prefix
-            return
-        if node.children:
-            traverse(node.children[0], prefix + "0")
-            traverse(node.children[1], prefix + "1")
+    return codes, avg_length, entropy, probabilities, (symbols, left, right, root)
 
-    traverse(root)
 
-    # Compute average code length
-    avg_length = sum(probabilities[sym] * len(codes[sym]) for sym in codes)
+def to_anytree(symbols, left, right, root):
+    """
+    Convert a Huffman tree in flat lists, as returned by build_huffman_code,
+    into anytree nodes so that it can be rendered.
+    Returns the root node.
+    """
+    # anytree is only needed to render the tree, so it is only imported then
+    from anytree import Node
 
-    return codes, avg_length, probabilities, root
+    # Children are always created before their parent
+    nodes = []
+    for node, (node1, node2) in enumerate(zip(left, right)):
+        if node1 == -1:
+            nodes.append(Node(symbols[node]))  # Leaf node
+        else:
+            # Merged nodes are named after their index rather than after the
+            # symbols below them, which would make names grow with the tree
+            nodes.append(Node(f"#{node}", children=[nodes[node1], nodes[node2]]))
+    return nodes[root]
 
 
 def main():
@@ -114,6 +255,9 @@ def main():
                         help="The input string from which to build a Huffman code.")
     parser.add_argument("--explain", action="store_true",
                         help="If set, explain the process (frequencies, probabilities, code table).")
+    parser.add_argument("--canonical", action="store_true",
+                        help="Assign canonical codes: same lengths, consecutive codes in order of "
+                             "length and symbol (as in DEFLATE).")
     args = parser.parse_args()
 
     text = args.input_string.replace(' ', '_')
@@ -122,33 +266,41 @@ def main():
         sys.exit(1)
 
     # 1. Count frequencies
-    freq_table = Counter(text)
-
-    # 2. Build Huffman code (and possibly print explanation)
-    codes, avg_length, probabilities, huffman_tree = build_huffman_code(freq_table, explain=args.explain)
+    freq_table = count_frequencies(text)
 
-    # 3. Compute entropy
-    entropy = compute_entropy(probabilities)
+    # 2. Build Huffman code and compute entropy (and possibly print explanation)
+    codes, avg_length, entropy, probabilities, flat_tree = build_huffman_code(
+        freq_table, explain=args.explain, canonical=args.canonical)
+    # The anytree nodes are only needed to render the tree
+    huffman_tree = to_anytree(*flat_tree) if args.explain else None
 
-    # 4. Print results
-    sorted_symbols = sorted(freq_table.keys(), key=lambda s: (-freq_table[s], len(codes[s]), codes[s]))
+    # 3. Print results
+    # One row per symbol, ordered by decreasing frequency, then by code.
+    # Each row carries everything that is printed for its symbol, so that the
+    # tables below need no further lookups. The sort keys come first, and
+    # since codes are unique the symbol never takes part in comparisons.
+    rows = [(-freq, len(codes[sym]), codes[sym], sym, probabilities[sym])
+            for sym, freq in freq_table.items()]
+    rows.sort()
 
     if args.explain:
+        from anytree import RenderTree
+
         print(f'\n{text}')
         # Print ASCII tree representation
+        # (the tree and the table are written out in one go each, rather than
+        # with one print() per line)
         print("\nHuffman Tree Representation:")
-        for pre, _, node in RenderTree(huffman_tree):
-            print(f"{pre}{node.name}")
+        sys.stdout.write(''.join(f"{pre}{node.name}\n" for pre, _, node in RenderTree(huffman_tree)))
 
         print("\nSymbol  Frequency  Probability     Huffman Code")
-        for sym in sorted_symbols:
-            print(f"{repr(sym):<7} {freq_table[sym]:<10} {probabilities[sym]:<15.6g} {codes[sym]}")
+        sys.stdout.write(''.join(f"{repr(sym):<7} {-neg_freq:<10} {prob:<15.6g} {code}\n"
+                                 for neg_freq, _, code, sym, prob in rows))
         print(f"\nEntropy of distribution: {entropy:.4f} bits/symbol")
         print(f"Average code length:     {avg_length:.4f} bits/symbol")
     else:
         # Minimal output: just show the code table, entropy, and average length.
-        for sym in sorted_symbols:
-            print(f"{repr(sym)} => {codes[sym]}")
+        sys.stdout.write(''.join(f"{repr(sym)} => {code}\n" for _, _, code, sym, _ in rows))
         print()
         print(f"Entropy={entropy:.4f} bits/symbol, AvgCodeLen={avg_length:.4f} bits/symbol")
 
@@ -1,12 +1,14 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 import math
-import heapq
-import itertools
+import time
+from collections import Counter
 
 
 # A simple Huffman node for building the tree.
 class HuffmanNode:
+    __slots__ = ('char', 'freq', 'left', 'right', 'text')
+
     def __init__(self, char, freq, left=None, right=None):
         self.char = char  # Character (or '*' for internal nodes)
         self.freq = freq  # Frequency
@@ -17,6 +19,9 @@ class HuffmanNode:
 
 # A class that associates a HuffmanNode with its visual representation.
 class VisualNode:
+    __slots__ = ('huff_node', 'x', 'y', 'circle_id', 'text_id', 'children', 'line_id',
+                 'subtree', 'subtree_dx', 'tag')
+
     def __init__(self, huff_node, x, y):
         self.huff_node = huff_node  # The underlying Huffman node.
         self.x = x  # x-coordinate (center)
@@ -24,8 +29,15 @@ class VisualNode:
         self.circle_id = None  # Canvas id for the circle.
         self.text_id = None  # Canvas id for the label.
         self.children = []  # List of child VisualNodes (if merged)
-        # Each entry: (line_id, child, label_id) – now label_id will be None.
-        self.lines = []
+        # Canvas id of the line joining the children through this node (if merged).
+        self.line_id = None
+        # All VisualNodes in the subtree rooted here (this one first), and the
+        # (min, max) offset of their x from this node's x. Subtrees only ever
+        # move as a whole, so both stay valid once the children are attached.
+        self.subtree = [self]
+        self.subtree_dx = (0, 0)
+        # Canvas tag carried by every item drawn for this subtree (circles, labels and lines).
+        self.tag = f"sub{id(self)}"
 
 
 class HuffmanGUI:
@@ -89,9 +101,20 @@ class HuffmanGUI:
         self.vertical_gap = 80  # vertical gap between levels.
         self.leaf_margin = None  # horizontal gap between leaf centers (set in start_process).
         self.animation_running = False
+        self.frame_time = 16  # ms between animation frames.
+        # Running animations, all driven by a single frame timer.
+        # Each entry: (start_time, duration, on_frame, on_done).
+        self.animations = []
+        self.animation_tick_scheduled = False
         self.active_nodes = []  # List of current subtree roots.
+        # Every VisualNode created in the current run, including the ones in the middle of
+        # a merge, which are not reachable from active_nodes.
+        self.visual_nodes = []
         self.last_merge_children = []  # Stores the two nodes last merged.
         self.frequency_distribution = {}  # symbol: frequency
+        # Codes waiting to be shown in the result panel, and the id of the pending redraw.
+        self.pending_codes = None
+        self.results_after_id = None
 
         # Graph bounding box values (computed at start and fixed thereafter)
         self.graph_bbox_left = None
@@ -105,12 +128,19 @@ class HuffmanGUI:
     def start_process(self):
         """Reset and start a new Huffman tree process."""
         self.canvas.delete("all")
+        # Results of the previous run must not be shown after the reset.
+        if self.results_after_id is not None:
+            self.root.after_cancel(self.results_after_id)
+            self.results_after_id = None
+            self.pending_codes = None
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)
         self.result_text.config(state=tk.DISABLED)
         self.active_nodes = []
+        self.visual_nodes = []
         self.frequency_distribution = {}
         self.playing = False
+        self.animations = []  # Drop any animation of the previous process.
 
         self.text = self.input_entry.get().strip()
         if not self.text:
@@ -118,14 +148,11 @@ class HuffmanGUI:
             return
 
         # Compute frequency distribution.
-        freq = {}
-        total = len(self.text)
-        for ch in self.text:
-            freq[ch] = freq.get(ch, 0) + 1
-        self.frequency_distribution = freq
-
-        # Sort characters in decreasing order of frequency.
-        sorted_items = sorted(freq.items(), key=lambda item: item[1], reverse=True)
+        freq = Counter(self.text)
+        self.frequency_distribution = dict(freq)
+
+        # Sort characters in decreasing order of frequency (ties keep their order of first appearance).
+        sorted_items = freq.most_common()
         num = len(sorted_items)
         spacing = self.canvas_width / (num + 1)
         self.leaf_margin = spacing - 2 * self.node_radius
@@ -134,14 +161,14 @@ class HuffmanGUI:
         for i, (ch, f) in enumerate(sorted_items):
             x = spacing * (i + 1)
             node = VisualNode(HuffmanNode(ch, f), x, leaf_y)
+            self.visual_nodes.append(node)
             self.draw_node(node)
             self.active_nodes.append(node)
 
         # Precompute the fixed graph bounding box.
         self.graph_bbox_left = min(node.x - self.node_radius for node in self.active_nodes)
         self.graph_bbox_right = max(node.x + self.node_radius for node in self.active_nodes)
-        final_tree = self.compute_final_tree()
-        max_level = self.compute_max_level(final_tree)
+        max_level = self.compute_max_level()
         graph_height = (max_level * self.vertical_gap) + 2 * self.node_radius
         self.graph_bbox_bottom = leaf_y + self.node_radius
         self.graph_bbox_top = self.graph_bbox_bottom - graph_height
@@ -159,66 +186,59 @@ class HuffmanGUI:
             radius = self.node_radius
         x, y = node.x, node.y
         node.circle_id = self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius,
-                                                 fill="lightblue", outline="black")
+                                                 fill="lightblue", outline="black",
+                                                 tags=(node.tag, "graph"))
         text = f"{node.huff_node.char}\n{node.huff_node.freq}"
-        node.text_id = self.canvas.create_text(x, y, text=text)
+        node.text_id = self.canvas.create_text(x, y, text=text, tags=(node.tag, "graph"))
 
     def get_subtree_nodes(self, node):
-        """Recursively collect all VisualNodes in the subtree rooted at node."""
-        nodes = [node]
-        for child in node.children:
-            nodes.extend(self.get_subtree_nodes(child))
-        return nodes
+        """Return all VisualNodes in the subtree rooted at node (cached, do not modify)."""
+        return node.subtree
 
     def get_subtree_bbox(self, node):
         """Return (min_x, max_x) for all nodes in the subtree rooted at node, considering node radii."""
-        nodes = self.get_subtree_nodes(node)
-        min_x = min(n.x - self.node_radius for n in nodes)
-        max_x = max(n.x + self.node_radius for n in nodes)
-        return (min_x, max_x)
+        min_dx, max_dx = node.subtree_dx
+        return (node.x + min_dx - self.node_radius, node.x + max_dx + self.node_radius)
 
     def update_node_position(self, node):
-        """Update the canvas coordinates for a node’s circle, text, and its connecting line labels."""
-        self.canvas.coords(node.circle_id,
-                           node.x - self.node_radius, node.y - self.node_radius,
-                           node.x + self.node_radius, node.y + self.node_radius)
-        self.canvas.coords(node.text_id, node.x, node.y)
-        for (line_id, child, label_id) in node.lines:
-            self.canvas.coords(line_id,
-                               node.x, node.y + self.node_radius,
-                               child.x, child.y - self.node_radius)
-            # If label exists, update its position.
-            if label_id is not None:
-                mid_x = (node.x + child.x) / 2
-                mid_y = (node.y + child.y) / 2
-                self.canvas.coords(label_id, mid_x, mid_y)
-
-    def compute_final_tree(self):
-        """Compute the final Huffman tree using a greedy algorithm (for final height)."""
-        counter = itertools.count()
-        heap = []
-        for ch, f in self.frequency_distribution.items():
-            heapq.heappush(heap, (f, next(counter), HuffmanNode(ch, f)))
-        while len(heap) > 1:
-            f1, _, node1 = heapq.heappop(heap)
-            f2, _, node2 = heapq.heappop(heap)
-            new_node = HuffmanNode('*', f1 + f2, left=node1, right=node2)
-            heapq.heappush(heap, (f1 + f2, next(counter), new_node))
-        return heap[0][2]
-
-    def compute_max_level(self, node, level=0):
-        """Compute the maximum level (depth) of the Huffman tree."""
-        if node.left is None and node.right is None:
-            return level
-        return max(self.compute_max_level(node.left, level + 1),
-                   self.compute_max_level(node.right, level + 1))
-
-    def get_all_nodes(self):
-        """Collect all nodes from all active trees."""
-        nodes = []
-        for node in self.active_nodes:
-            nodes.extend(self.get_subtree_nodes(node))
-        return nodes
+        """Update the canvas coordinates for a node’s circle, text, and the line to its children."""
+        coords = self.canvas.coords
+        r = self.node_radius
+        x, y = node.x, node.y
+        coords(node.circle_id, x - r, y - r, x + r, y + r)
+        coords(node.text_id, x, y)
+        if node.line_id is not None:
+            left, right = node.children
+            coords(node.line_id, left.x, left.y - r, x, y + r, right.x, right.y - r)
+
+    def compute_max_level(self):
+        """Compute the maximum level (depth) of the final Huffman tree.
+
+        Merged nodes are created in non-decreasing order of frequency, so instead of a
+        heap the merges are replayed with two queues: the sorted leaf frequencies and the
+        (frequency, depth) of the merged nodes. The smallest of both heads is taken each
+        time, preferring leaves on ties as the greedy construction does.
+        """
+        leaves = sorted(self.frequency_distribution.values())
+        num_leaves = len(leaves)
+        merged = []
+        i = j = 0
+        for _ in range(num_leaves - 1):
+            # Take the two smallest nodes
+            if i < num_leaves and (j == len(merged) or leaves[i] <= merged[j][0]):
+                f1, depth1 = leaves[i], 0
+                i += 1
+            else:
+                f1, depth1 = merged[j]
+                j += 1
+            if i < num_leaves and (j == len(merged) or leaves[i] <= merged[j][0]):
+                f2, depth2 = leaves[i], 0
+                i += 1
+            else:
+                f2, depth2 = merged[j]
+                j += 1
+            merged.append((f1 + f2, max(depth1, depth2) + 1))
+        return merged[-1][1] if merged else 0
 
     def center_graph(self):
         """
@@ -232,10 +252,13 @@ class HuffmanGUI:
         new_center = (cw / 2, ch / 2)
         offset_x = new_center[0] - self.graph_bbox_center[0]
         offset_y = new_center[1] - self.graph_bbox_center[1]
-        for node in self.get_all_nodes():
+        # Every item of the graph is tagged "graph", so a single move() shifts all of them.
+        # The positions of all nodes follow, not only those of the active trees: the nodes
+        # being merged are drawn again from them once the merge finishes.
+        self.canvas.move("graph", offset_x, offset_y)
+        for node in self.visual_nodes:
             node.x += offset_x
             node.y += offset_y
-            self.update_node_position(node)
         self.graph_bbox_center = (self.graph_bbox_center[0] + offset_x,
                                   self.graph_bbox_center[1] + offset_y)
 
@@ -245,6 +268,44 @@ class HuffmanGUI:
         self.canvas_height = event.height
         self.center_graph()
 
+    def start_animation(self, duration, on_frame, on_done):
+        """
+        Run an animation lasting `duration` ms: on_frame(fraction) is called on every frame
+        with the fraction of the duration elapsed so far (ending with exactly 1), and then
+        on_done() once.
+        """
+        self.animations.append((time.perf_counter(), duration / 1000, on_frame, on_done))
+        if not self.animation_tick_scheduled:
+            self.animation_tick_scheduled = True
+            self.root.after(self.frame_time, self.animation_tick)
+
+    def animation_tick(self):
+        """
+        Advance all running animations by one frame, based on the real time elapsed, so that
+        they keep their duration however often the timer actually fires.
+        """
+        now = time.perf_counter()
+        running = []
+        finished = []
+        for animation in self.animations:
+            start_time, duration, on_frame, on_done = animation
+            fraction = min(1.0, (now - start_time) / duration) if duration > 0 else 1.0
+            on_frame(fraction)
+            if fraction < 1.0:
+                running.append(animation)
+            else:
+                finished.append(on_done)
+        self.animations = running
+        # Redraw once for the whole frame.
+        self.canvas.update_idletasks()
+        # These may start new animations, which are picked up by the next frame.
+        for on_done in finished:
+            on_done()
+        if self.animations:
+            self.root.after(self.frame_time, self.animation_tick)
+        else:
+            self.animation_tick_scheduled = False
+
     def rearrange_nodes(self, callback):
         """
         Reorder active nodes (and their entire subtrees) in decreasing order of frequency,
@@ -254,16 +315,18 @@ class HuffmanGUI:
             to the right of the previous tree's bounding box.
         This preserves the overall spacing between leaf nodes.
         """
-        old_order = sorted(self.active_nodes, key=lambda node: self.get_subtree_bbox(node)[0])
-        if not old_order:
+        if not self.active_nodes:
             callback()
             return
-        overall_left = self.get_subtree_bbox(old_order[0])[0]
+        overall_left = min(self.get_subtree_bbox(node)[0] for node in self.active_nodes)
 
-        new_order = sorted(self.active_nodes, key=lambda node: node.huff_node.freq, reverse=True)
+        # active_nodes is kept in decreasing order of frequency already.
+        new_order = list(self.active_nodes)
+        bboxes = {}
         bbox_widths = {}
         for node in new_order:
             L, R = self.get_subtree_bbox(node)
+            bboxes[node] = (L, R)
             bbox_widths[node] = R - L
         target_centers = {}
         if new_order:
@@ -278,97 +341,63 @@ class HuffmanGUI:
                 target_centers[node] = new_left + width / 2
                 prev_right = new_left + width
 
+        # Every node in a subtree moves by the same offset as its root, so
+        # collect them once as (node, initial x, offset) rather than walking
+        # the subtrees again on every frame.
+        # Subtrees which are already in place are left out, so that their
+        # items are not touched at all. Offsets below a millionth of a pixel
+        # are rounding noise from the previous layouts, and count as in place.
+        moving = []
         anim_data = []
         for node in new_order:
-            L, R = self.get_subtree_bbox(node)
-            current_center = (L + R) / 2
-            subtree = self.get_subtree_nodes(node)
-            init_positions = {n: n.x for n in subtree}
-            anim_data.append((node, current_center, target_centers[node], init_positions))
-
-        steps = 20
-        step_time = int(20 / self.speed_scale.get())
-
-        def animate_step(i):
-            if i > steps:
-                for node, init_center, target_center, init_pos in anim_data:
-                    offset = target_center - init_center
-                    for subnode in self.get_subtree_nodes(node):
-                        subnode.x = init_pos[subnode] + offset
-                        self.update_node_position(subnode)
-                callback()
-                return
-            fraction = i / steps
-            for node, init_center, target_center, init_pos in anim_data:
-                offset = (target_center - init_center) * fraction
-                for subnode in self.get_subtree_nodes(node):
-                    new_x = init_pos[subnode] + offset
-                    subnode.x = new_x
-                    self.update_node_position(subnode)
-            self.root.after(step_time, lambda: animate_step(i + 1))
-
-        animate_step(0)
-
-    def select_pair_minimize(self, sorted_nodes):
-        """
-        Return indices (i, i+1) for a pair of adjacent nodes (sorted by x) that can be merged under
-        Huffman rules, or None if none exist.
-        """
-        if len(sorted_nodes) < 2:
-            return None
-        overall_sorted = sorted(sorted_nodes, key=lambda n: n.huff_node.freq)
-        candidate_sum = overall_sorted[0].huff_node.freq + overall_sorted[1].huff_node.freq
-        candidates = []
-        for i in range(len(sorted_nodes) - 1):
-            if sorted_nodes[i].huff_node.freq + sorted_nodes[i + 1].huff_node.freq == candidate_sum:
-                candidates.append((i, i + 1))
-        if candidates:
-            return candidates[-1]
-        return None
-
-    def next_step(self):
-        """Proceed to the next merge step. When finished, show results."""
-        if self.animation_running:
-            return
-        if len(self.active_nodes) <= 1:
-            final_tree = self.active_nodes[0].huff_node
-            codes = self.generate_codes(final_tree)
-            self.update_results(codes)
-            self.playing = False
-            self.play_button.config(state=tk.DISABLED)
-            self.pause_button.config(state=tk.DISABLED)
-            self.next_button.config(state=tk.DISABLED)
-            return
-        if self.minimize_var.get() == 1:
-            sorted_nodes = sorted(self.active_nodes, key=lambda n: n.x)
-            pair = self.select_pair_minimize(sorted_nodes)
-            if pair is not None:
-                node1 = sorted_nodes[pair[0]]
-                node2 = sorted_nodes[pair[1]]
-                self.active_nodes.remove(node1)
-                self.active_nodes.remove(node2)
-                self.highlight_nodes([node1, node2], "orange",
-                                     lambda: self.merge_nodes(node1, node2))
-                return
-        self.rearrange_nodes(lambda: self.merge_smallest_nodes())
+            L, R = bboxes[node]
+            offset = target_centers[node] - (L + R) / 2
+            if abs(offset) < 1e-6:
+                continue
+            moving.append((node.tag, offset))
+            for subnode in self.get_subtree_nodes(node):
+                anim_data.append((subnode, subnode.x, offset))
+
+        # Fraction of the movement already applied to the canvas items
+        shown_fraction = 0.0
+        move = self.canvas.move
+        update_node_position = self.update_node_position
+
+        def animate_frame(fraction):
+            nonlocal shown_fraction
+            for subnode, init_x, offset in anim_data:
+                subnode.x = init_x + offset * fraction
+            if fraction < 1:
+                # Each subtree moves rigidly, so a single move() of its tag shifts all of its
+                # circles, labels and lines at once.
+                step = fraction - shown_fraction
+                for tag, offset in moving:
+                    move(tag, offset * step, 0)
+                shown_fraction = fraction
+            else:
+                # Snap to the exact final coordinates. Every node is moved before redrawing
+                # any, so that the lines are drawn to the final position of the children.
+                for subnode, _, _ in anim_data:
+                    update_node_position(subnode)
+
+        self.start_animation(400 / self.speed_scale.get(), animate_frame, callback)
 
     def merge_smallest_nodes(self):
         """Merge the two rightmost active nodes (by x-coordinate)."""
         if len(self.active_nodes) < 2:
             self.animation_running = False
             return
-        sorted_nodes = sorted(self.active_nodes, key=lambda n: n.x)
-        node1 = sorted_nodes[-2]
-        node2 = sorted_nodes[-1]
-        self.active_nodes.remove(node1)
-        self.active_nodes.remove(node2)
+        # This always runs right after rearrange_nodes, which lays the active nodes out from
+        # left to right in their order in the list, so the rightmost ones are the last two.
+        node2 = self.active_nodes.pop()
+        node1 = self.active_nodes.pop()
         self.highlight_nodes([node1, node2], "orange", lambda: self.merge_nodes(node1, node2))
 
     def highlight_nodes(self, nodes, color, callback):
         """Highlight given nodes by changing their fill color, then call callback."""
         for node in nodes:
             self.canvas.itemconfig(node.circle_id, fill=color)
-        self.root.after(500, callback)
+        self.root.after(int(500 / self.speed_scale.get()), callback)
 
     def merge_nodes(self, node1, node2):
         """Merge two nodes, create their parent, and animate its appearance."""
@@ -379,60 +408,71 @@ class HuffmanGUI:
         new_x = (node1.x + node2.x) / 2
         new_y = min(node1.y, node2.y) - self.vertical_gap
         new_visual = VisualNode(parent_huff, new_x, new_y)
+        self.visual_nodes.append(new_visual)
         new_visual.children = [node1, node2]
-        self.animate_node_creation(new_visual, lambda: self.finish_merge(new_visual))
+        new_visual.subtree = [new_visual] + node1.subtree + node2.subtree
+        offsets = [n.x - new_x for n in new_visual.subtree]
+        new_visual.subtree_dx = (min(offsets), max(offsets))
+        # The items of both children are part of the new subtree from now on.
+        for child in new_visual.children:
+            self.canvas.addtag_withtag(new_visual.tag, child.tag)
+        self.animate_node_creation(new_visual, lambda: self.finish_merge(new_visual),
+                                   duration=500 / self.speed_scale.get())
 
-    def animate_node_creation(self, node, callback, steps=10):
+    def animate_node_creation(self, node, callback, duration=500):
         """Animate a node’s appearance by scaling its circle from 0 to full size."""
         x, y = node.x, node.y
-        initial_radius = 0
         final_radius = self.node_radius
         node.circle_id = self.canvas.create_oval(x, y, x, y,
-                                                 fill="lightblue", outline="black")
+                                                 fill="lightblue", outline="black",
+                                                 tags=(node.tag, "graph"))
         node.text_id = self.canvas.create_text(x, y,
-                                               text=f"{node.huff_node.char}\n{node.huff_node.freq}")
+                                               text=f"{node.huff_node.char}\n{node.huff_node.freq}",
+                                               tags=(node.tag, "graph"))
 
-        def step(i):
-            if i > steps:
-                callback()
-                return
-            r = initial_radius + (final_radius - initial_radius) * i / steps
-            self.canvas.coords(node.circle_id, x - r, y - r, x + r, y + r)
-            self.root.after(50, lambda: step(i + 1))
+        coords = self.canvas.coords
+        circle_id = node.circle_id
 
-        step(0)
+        def grow(fraction):
+            # The position is read on every frame, as the graph may be re-centered meanwhile
+            x, y = node.x, node.y
+            r = final_radius * fraction
+            coords(circle_id, x - r, y - r, x + r, y + r)
+
+        self.start_animation(duration, grow, callback)
 
     def finish_merge(self, new_visual):
         """After parent node animation, draw connecting lines (without extra labels) and update active nodes."""
-        line_ids = []
-        for child in new_visual.children:
-            line_id = self.canvas.create_line(new_visual.x, new_visual.y + self.node_radius,
-                                              child.x, child.y - self.node_radius, width=2)
-            # No labels on the branches.
-            line_ids.append((line_id, child, None))
-        new_visual.lines = line_ids
-        self.active_nodes.append(new_visual)
-        self.active_nodes.sort(key=lambda n: n.huff_node.freq, reverse=True)
+        # Both branches are drawn as a single line, from the left child through the parent
+        # to the right child, so that moving them takes one canvas call instead of two.
+        r = self.node_radius
+        left, right = new_visual.children
+        new_visual.line_id = self.canvas.create_line(left.x, left.y - r,
+                                                     new_visual.x, new_visual.y + r,
+                                                     right.x, right.y - r, width=2,
+                                                     tags=(new_visual.tag, "graph"))
+        self.insert_active_node(new_visual)
         self.animation_running = False
         if self.playing:
-            self.root.after(100, self.next_step)
+            # The pause between steps follows the speed setting, like the animations do
+            self.root.after(int(100 / self.speed_scale.get()), self.next_step)
 
-    def play_process(self):
-        """Start auto-play mode (simulate next_step repeatedly)."""
-        if not self.playing:
-            self.playing = True
-            self.play_button.config(state=tk.DISABLED)
-            self.next_button.config(state=tk.DISABLED)
-            self.pause_button.config(state=tk.NORMAL)
-            self.next_step()
+    def insert_active_node(self, node):
+        """Insert node into active_nodes, keeping them in decreasing order of frequency.
 
-    def pause_process(self):
-        """Pause auto-play mode."""
-        if self.playing:
-            self.playing = False
-            self.play_button.config(state=tk.NORMAL)
-            self.next_button.config(state=tk.NORMAL)
-            self.pause_button.config(state=tk.DISABLED)
+        The node goes after any other nodes with the same frequency, as a stable sort would
+        place it. The position is found by binary search, so the list is never re-sorted.
+        """
+        nodes = self.active_nodes
+        freq = node.huff_node.freq
+        lo, hi = 0, len(nodes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if nodes[mid].huff_node.freq >= freq:
+                lo = mid + 1
+            else:
+                hi = mid
+        nodes.insert(lo, node)
 
     def next_step(self):
         """Proceed to the next merge step. When finished, show results."""
@@ -441,7 +481,7 @@ class HuffmanGUI:
         if len(self.active_nodes) <= 1:
             final_tree = self.active_nodes[0].huff_node
             codes = self.generate_codes(final_tree)
-            self.update_results(codes)
+            self.schedule_results(codes)
             self.playing = False
             self.play_button.config(state=tk.DISABLED)
             self.pause_button.config(state=tk.DISABLED)
@@ -453,8 +493,9 @@ class HuffmanGUI:
             if pair is not None:
                 node1 = sorted_nodes[pair[0]]
                 node2 = sorted_nodes[pair[1]]
-                self.active_nodes.remove(node1)
-                self.active_nodes.remove(node2)
+                # Drop both nodes in a single pass over the list
+                self.active_nodes = [n for n in self.active_nodes
+                                     if n is not node1 and n is not node2]
                 self.highlight_nodes([node1, node2], "orange",
                                      lambda: self.merge_nodes(node1, node2))
                 return
@@ -464,14 +505,19 @@ class HuffmanGUI:
         """Return indices (i, i+1) for a pair of adjacent nodes (sorted by x) that can be merged under Huffman rules, or None."""
         if len(sorted_nodes) < 2:
             return None
-        overall_sorted = sorted(sorted_nodes, key=lambda n: n.huff_node.freq)
-        candidate_sum = overall_sorted[0].huff_node.freq + overall_sorted[1].huff_node.freq
-        candidates = []
-        for i in range(len(sorted_nodes) - 1):
-            if sorted_nodes[i].huff_node.freq + sorted_nodes[i + 1].huff_node.freq == candidate_sum:
-                candidates.append((i, i + 1))
-        if candidates:
-            return candidates[-1]
+        freqs = [n.huff_node.freq for n in sorted_nodes]
+        # Find the two smallest frequencies in one pass.
+        min1 = min2 = math.inf
+        for f in freqs:
+            if f < min1:
+                min1, min2 = f, min1
+            elif f < min2:
+                min2 = f
+        candidate_sum = min1 + min2
+        # Take the rightmost adjacent pair adding up to it.
+        for i in range(len(freqs) - 2, -1, -1):
+            if freqs[i] + freqs[i + 1] == candidate_sum:
+                return (i, i + 1)
         return None
 
     def play_process(self):
@@ -491,19 +537,38 @@ class HuffmanGUI:
             self.next_button.config(state=tk.NORMAL)
             self.pause_button.config(state=tk.DISABLED)
 
-    def generate_codes(self, node, prefix="", code_dict=None):
-        """Recursively traverse the Huffman tree to generate codes."""
-        if code_dict is None:
-            code_dict = {}
-        if node.left is None and node.right is None:
-            code_dict[node.char] = prefix or "0"
-        else:
-            if node.left:
-                self.generate_codes(node.left, prefix + "0", code_dict)
+    def generate_codes(self, root):
+        """Traverse the Huffman tree to generate codes."""
+        code_dict = {}
+        # Depth-first, left before right, with an explicit stack of (node, code so far)
+        stack = [(root, "")]
+        while stack:
+            node, prefix = stack.pop()
+            if node.left is None and node.right is None:
+                code_dict[node.char] = prefix or "0"
+                continue
             if node.right:
-                self.generate_codes(node.right, prefix + "1", code_dict)
+                stack.append((node.right, prefix + "1"))
+            if node.left:
+                stack.append((node.left, prefix + "0"))
         return code_dict
 
+    def schedule_results(self, codes):
+        """
+        Show codes in the result panel shortly. Requests made before the redraw happens are
+        coalesced, so the panel is only rewritten once, with the latest codes.
+        """
+        self.pending_codes = codes
+        if self.results_after_id is None:
+            self.results_after_id = self.root.after(50, self.flush_results)
+
+    def flush_results(self):
+        """Rewrite the result panel with the latest codes passed to schedule_results."""
+        codes = self.pending_codes
+        self.results_after_id = None
+        self.pending_codes = None
+        self.update_results(codes)
+
     def update_results(self, codes):
         """Update the result panel with a table of symbols, frequencies, codes, code lengths,
            plus the entropy and average code length, including the grouped operations that
@@ -511,11 +576,9 @@ class HuffmanGUI:
         """
         total = sum(self.frequency_distribution.values())
 
-        # Precompute first occurrence of each symbol in self.text
-        first_occurrence = {}
-        for i, ch in enumerate(self.text):
-            if ch not in first_occurrence:
-                first_occurrence[ch] = i
+        # Symbols were counted in order of first appearance, so their position in the
+        # frequency distribution orders them by first occurrence in self.text
+        first_occurrence = {ch: i for i, ch in enumerate(self.frequency_distribution)}
 
         # Sorting key:
         # 1) decreasing frequency
@@ -530,38 +593,25 @@ class HuffmanGUI:
         symbols_sorted = sorted(self.frequency_distribution.keys(), key=sort_key)
 
         # --- Build table and also collect grouping data ---
-        lines = []
         header = f"{'Symbol':^8} | {'Freq':^8} | {'Code':^12} | {'Len':^5}"
         separator = "-" * len(header)
-        lines.append(header)
-        lines.append(separator)
-
-        avg_length = 0.0
-        entropy = 0.0
+        rows = [(symbol, self.frequency_distribution[symbol], codes.get(symbol, ""))
+                for symbol in symbols_sorted]
+        table = [f"{symbol:^8} | {f'{freq}/{total}':^8} | {code:^12} | {len(code):^5}"
+                 for symbol, freq, code in rows]
 
         # Grouping:
         # Avg length groups: (freq, length) -> count
-        avg_groups = {}
+        avg_groups = Counter((freq, len(code)) for _, freq, code in rows)
         # Entropy groups: freq -> count
-        ent_groups = {}
-
-        for symbol in symbols_sorted:
-            freq = self.frequency_distribution[symbol]
-            p = freq / total
-            code = codes.get(symbol, "")
-            length = len(code)
+        ent_groups = Counter(self.frequency_distribution.values())
 
-            avg_length += p * length
-            if p > 0:
-                entropy -= p * math.log2(p)
-
-            avg_groups[(freq, length)] = avg_groups.get((freq, length), 0) + 1
-            ent_groups[freq] = ent_groups.get(freq, 0) + 1
-
-            freq_str = f"{freq}/{total}"
-            lines.append(f"{symbol:^8} | {freq_str:^8} | {code:^12} | {length:^5}")
-
-        lines.append(separator)
+        # Both sums are computed over the groups, so each distinct frequency needs a single
+        # log2(): -p·log2(p) = freq/total·log2(total/freq). The average length is summed in
+        # integers and divided once.
+        avg_length = sum(freq * length * k for (freq, length), k in avg_groups.items()) / total
+        entropy = math.fsum(k * freq * math.log2(total / freq)
+                            for freq, k in ent_groups.items()) / total
 
         # --- Build grouped operation strings ---
         def join_terms(terms):
@@ -587,11 +637,15 @@ class HuffmanGUI:
             ent_terms.append(f"{prefix}(-{p_str}·log2({p_str}))")
         ent_expr = join_terms(ent_terms)
 
-        # --- Append operation + result ---
-        lines.append(f"Entropy: {ent_expr} = {entropy:.4f} bits/symbol")
-        lines.append(f"Avg code length: {avg_expr} = {avg_length:.4f} bits/symbol")
-
-        result_str = "\n".join(lines)
+        # --- Assemble table + operations + results ---
+        result_str = "\n".join([
+            header,
+            separator,
+            *table,
+            separator,
+            f"Entropy: {ent_expr} = {entropy:.4f} bits/symbol",
+            f"Avg code length: {avg_expr} = {avg_length:.4f} bits/symbol",
+        ])
 
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)